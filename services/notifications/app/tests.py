@@ -0,0 +1,124 @@
+"""Tests for the notifications consumer.
+
+No broker and no SMTP server: batches are fed straight into _flush with fake
+deliveries, and the SMTP send is replaced by a recorder.
+"""
+
+import asyncio
+import pytest
+from app import consumer
+
+# anyio's pytest plugin runs the async tests below
+pytest_plugins = ("anyio",)
+pytestmark     = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class FakeMessage:
+    """Just enough of aio_pika.IncomingMessage for _flush."""
+
+    def __init__(self, body: bytes):
+        self.body   = body
+        self.acked  = False
+        self.nacked = False
+
+    async def ack(self, multiple: bool = False) -> None:
+        self.acked = True
+
+    async def nack(self, requeue: bool = True) -> None:
+        self.nacked = True
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record emails instead of sending them."""
+    outbox: list[tuple[str, str]] = []
+
+    async def fake_send_email(to: str, subject: str, body: str) -> None:
+        outbox.append((to, subject))
+
+    monkeypatch.setattr(consumer, "_send_email", fake_send_email)
+    return outbox
+
+
+# ──────────────────────────────────────────
+#  Batch handling
+# ──────────────────────────────────────────
+
+async def test_flush_sends_and_acks_batch(sent):
+    batch = [
+        FakeMessage(b'{"event_type":"order.created","order_id":"abcdef123456","user_id":1}'),
+        FakeMessage(b'{"event_type":"order.paid","order_id":"abcdef123456","user_id":1}'),
+    ]
+    await consumer._flush(batch)
+    assert len(sent) == 2
+    assert batch[-1].acked
+
+
+@pytest.mark.parametrize("body", [b"[1,2]", b'"str"', b"42", b"not json"])
+async def test_flush_nacks_non_object_bodies(sent, body):
+    bad  = FakeMessage(body)
+    good = FakeMessage(b'{"event_type":"order.created","order_id":"abcdef123456","user_id":1}')
+    await consumer._flush([bad, good])
+    assert bad.nacked
+    assert good.acked
+    assert len(sent) == 1
+
+
+async def test_flush_survives_handler_error(sent):
+    # order_id missing: the handler's order_id[:8] raises
+    broken = FakeMessage(b'{"event_type":"order.created","user_id":1}')
+    good   = FakeMessage(b'{"event_type":"order.cancelled","order_id":"abcdef123456","user_id":1}')
+    await consumer._flush([broken, good])
+    assert good.acked
+    assert sent == [("user-1@example.com", "Order #abcdef12 cancelled")]
+
+
+# ──────────────────────────────────────────
+#  SMTP session pool
+# ──────────────────────────────────────────
+
+class FakeSMTP:
+    """Counts in-flight sends across all sessions."""
+    opened    = 0
+    in_flight = 0
+    peak      = 0
+
+    def __init__(self):
+        FakeSMTP.opened += 1
+        self.is_connected = True
+
+    async def send_message(self, msg) -> None:
+        FakeSMTP.in_flight += 1
+        FakeSMTP.peak = max(FakeSMTP.peak, FakeSMTP.in_flight)
+        await asyncio.sleep(0.01)
+        FakeSMTP.in_flight -= 1
+
+    async def quit(self) -> None:
+        self.is_connected = False
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    async def fake_open():
+        return FakeSMTP()
+
+    FakeSMTP.opened = FakeSMTP.in_flight = FakeSMTP.peak = 0
+    monkeypatch.setattr(consumer, "_open_smtp", fake_open)
+    yield FakeSMTP
+    consumer._smtp_idle.clear()
+
+
+async def test_batch_sends_concurrently_over_pooled_sessions(fake_smtp):
+    jobs = [("order.created", {"order_id": f"order{i:04d}", "user_id": i}) for i in range(20)]
+    await consumer._send_batch(jobs)
+    assert fake_smtp.peak == consumer.SMTP_POOL
+    assert fake_smtp.opened == consumer.SMTP_POOL
+
+    # Next batch reuses the idle sessions instead of reconnecting
+    await consumer._send_batch(jobs)
+    assert fake_smtp.opened == consumer.SMTP_POOL
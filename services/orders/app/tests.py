@@ -0,0 +1,218 @@
+"""Integration tests for the orders service.
+
+Same pattern as the users suite: httpx AsyncClient over ASGITransport, in-process.
+RabbitMQ is replaced by a fake exchange on app.state, so the outbox relay can be
+driven step by step with _drain_outbox().
+"""
+
+import asyncio
+import datetime
+import logging
+import jwt
+import orjson
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app import main, saga
+from app.main import app, Base, engine, AsyncSession_, OrderModel, OutboxModel, JWT_SECRET
+
+# anyio's pytest plugin runs the async tests and fixtures below
+pytest_plugins = ("anyio",)
+pytestmark     = pytest.mark.anyio
+
+ITEMS = [{"sku": "a", "quantity": 2, "unit_price_cents": 150}]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="function", autouse=True)
+async def setup_db():
+    """Create tables before each test, drop after."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    main._token_cache.clear()
+
+
+class FakeExchange:
+    """Records publishes; set .fail to make them raise like a broker outage."""
+
+    def __init__(self):
+        self.published: list[tuple[str, bytes]] = []
+        self.fail = False
+
+    async def publish(self, message, routing_key: str) -> None:
+        if self.fail:
+            raise ConnectionError("broker down")
+        self.published.append((routing_key, message.body))
+
+
+@pytest.fixture(autouse=True)
+def exchange(monkeypatch):
+    fake = FakeExchange()
+    monkeypatch.setattr(app.state, "orders_exchange", fake, raising=False)
+    return fake
+
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+def _token(uid: int = 7, role: str = "user", expires_in: int = 3600) -> str:
+    exp = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in)
+    return jwt.encode({"sub": f"u{uid}@test.com", "uid": uid, "role": role, "exp": exp}, JWT_SECRET, algorithm="HS256")
+
+
+def _auth(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _rows(model) -> list:
+    async with AsyncSession_() as db:
+        return (await db.execute(select(model))).scalars().all()
+
+
+# ──────────────────────────────────────────
+#  Orders + outbox
+# ──────────────────────────────────────────
+
+async def test_create_order_writes_order_and_outbox_row(client, exchange):
+    resp = await client.post("/orders", json={"items": ITEMS}, headers=_auth(_token()))
+    assert resp.status_code == 201
+    order = resp.json()
+    assert order["total_cents"] == 300
+    assert order["user_id"] == 7
+
+    [row] = await _rows(OutboxModel)
+    assert row.topic == "order.created"
+    event = orjson.loads(row.body)
+    assert event["event_type"] == "order.created"
+    assert event["order_id"] == order["id"]
+    assert event["items"] == ITEMS
+    # Nothing is published on the request path
+    assert exchange.published == []
+
+
+async def test_create_order_rolls_back_order_if_outbox_write_fails(client, monkeypatch):
+    # topic is NOT NULL, so this outbox row fails the commit
+    monkeypatch.setattr(main, "_outbox_event", lambda event_type, payload: OutboxModel(topic=None, body=b"", created_at=0))
+    with pytest.raises(IntegrityError):
+        await client.post("/orders", json={"items": ITEMS}, headers=_auth(_token()))
+    assert await _rows(OrderModel) == []
+    assert await _rows(OutboxModel) == []
+
+
+async def test_drain_outbox_publishes_then_deletes(client, exchange):
+    resp = await client.post("/orders", json={"items": ITEMS}, headers=_auth(_token()))
+    order_id = resp.json()["id"]
+
+    assert await main._drain_outbox() == 1
+    [(routing_key, body)] = exchange.published
+    assert routing_key == "order.created"
+    assert orjson.loads(body)["order_id"] == order_id
+    assert await _rows(OutboxModel) == []
+    # Caught up: nothing left to send
+    assert await main._drain_outbox() == 0
+
+
+async def test_drain_outbox_keeps_rows_when_publish_fails(client, exchange):
+    await client.post("/orders", json={"items": ITEMS}, headers=_auth(_token()))
+    exchange.fail = True
+
+    with pytest.raises(ConnectionError):
+        await main._drain_outbox()
+    assert len(await _rows(OutboxModel)) == 1
+
+    # Broker back: the retry delivers it
+    exchange.fail = False
+    assert await main._drain_outbox() == 1
+    assert len(exchange.published) == 1
+
+
+# ──────────────────────────────────────────
+#  Reads + auth
+# ──────────────────────────────────────────
+
+async def test_get_order_owner_and_other_user(client):
+    token    = _token(uid=7)
+    order_id = (await client.post("/orders", json={"items": ITEMS}, headers=_auth(token))).json()["id"]
+
+    resp = await client.get(f"/orders/{order_id}", headers=_auth(token))
+    assert resp.status_code == 200
+    assert resp.json()["items"] == ITEMS
+
+    resp = await client.get(f"/orders/{order_id}", headers=_auth(_token(uid=8)))
+    assert resp.status_code == 403
+
+
+async def test_get_unknown_order_returns_404(client):
+    resp = await client.get("/orders/doesnotexist", headers=_auth(_token()))
+    assert resp.status_code == 404
+
+
+async def test_missing_token_returns_401(client):
+    resp = await client.post("/orders", json={"items": ITEMS})
+    assert resp.status_code == 401
+
+
+async def test_repeated_calls_with_same_token_decode_once(client, monkeypatch):
+    token   = _token()
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+
+    for _ in range(2):
+        resp = await client.get("/orders/doesnotexist", headers=_auth(token))
+        assert resp.status_code == 404
+    assert len(decodes) == 1
+    assert token in main._token_cache
+
+
+async def test_expired_token_returns_401(client):
+    resp = await client.get("/orders/x", headers=_auth(_token(expires_in=-1)))
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "token expired"
+
+
+async def test_token_expired_while_cached_returns_401(client):
+    token   = _token(expires_in=-1)
+    payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"], options={"verify_exp": False})
+    # Cached while it was still valid; it has expired since
+    main._token_cache[token] = (payload["exp"], payload)
+
+    resp = await client.get("/orders/x", headers=_auth(token))
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "token expired"
+    assert token not in main._token_cache
+
+
+# ──────────────────────────────────────────
+#  Saga compensation
+# ──────────────────────────────────────────
+
+@pytest.mark.parametrize("error", [ConnectionError("broker down"), asyncio.CancelledError()])
+async def test_compensation_logs_each_step_outcome(monkeypatch, caplog, error):
+    async def publish(routing_key: str, payload: dict) -> None:
+        if routing_key == "payment.refund":
+            raise error
+
+    monkeypatch.setattr(saga, "_publish", publish)
+    caplog.set_level(logging.INFO, logger=saga.logger.name)
+
+    saga_id = saga.create_saga("order-1", 7, ITEMS)
+    await saga.advance_saga(saga_id, saga.SagaStep.RESERVE_INVENTORY, True)
+    await saga.advance_saga(saga_id, saga.SagaStep.CHARGE_PAYMENT, True)
+    await saga.advance_saga(saga_id, saga.SagaStep.CONFIRM_ORDER, False)
+
+    messages = [(r.levelno, r.getMessage()) for r in caplog.records]
+    assert any(level == logging.ERROR and "compensation failed" in msg and "charge_payment" in msg for level, msg in messages)
+    assert (logging.INFO, "[saga] compensated: released inventory for order_id=order-1") in messages
+    assert not any("issued refund" in msg for _, msg in messages)
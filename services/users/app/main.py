@@ -1,10 +1,12 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import DeclarativeBase, sessionmaker, mapped_column, Mapped
-from sqlalchemy import select, String, Integer
-import os, bcrypt, jwt, datetime, logging
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, StringConstraints
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped
+from sqlalchemy import select, bindparam, String, Integer
+from typing import Annotated
+import os, bcrypt, jwt, datetime, logging, time, asyncio
 
 # Users service — owns identity. Issues JWTs for the other services to verify.
 # Key microservice principle: one service owns the data, others call it or verify tokens.
@@ -16,8 +18,11 @@ DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///./users.db")
 JWT_SECRET   = os.environ.get("JWT_SECRET", "dev-secret-change-me")
 JWT_ALGO     = "HS256"
 
-engine       = create_async_engine(DATABASE_URL, echo=False)
-AsyncSession_ = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Pool and statement-cache sizing as in the orders service
+engine       = create_async_engine(
+    DATABASE_URL, echo=False, pool_size=20, max_overflow=40, query_cache_size=1200,
+)
+AsyncSession_ = async_sessionmaker(engine, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -32,6 +37,11 @@ class UserModel(Base):
     role:           Mapped[str]    = mapped_column(String(50), default="user")
 
 
+# Built once at import; requests only supply the bind value, and the compiled
+# SQL is reused from the engine's statement cache.
+_SEL_USER_BY_EMAIL = select(UserModel).where(UserModel.email == bindparam("email"))
+
+
 app = FastAPI(title="Users Service", version="0.1.0")
 
 
@@ -46,8 +56,13 @@ async def get_db():
         yield session
 
 
+# "Looks like an email" is all we need. A pattern constraint is compiled once by
+# pydantic-core, unlike EmailStr which runs email-validator on every request.
+Email = Annotated[str, StringConstraints(pattern=r"^[^@\s]+@[^@\s]+\.[^@\s]+$", max_length=254)]
+
+
 class UserCreate(BaseModel):
-    email: EmailStr
+    email: Email
     password: str
     role: str = "user"
 
@@ -61,12 +76,21 @@ class UserResponse(BaseModel):
         orm_mode = True
 
 
-def _hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+def _user_response(user: UserModel, status_code: int = 200) -> JSONResponse:
+    """Returning a Response skips FastAPI's response_model re-validation;
+    the route's response_model= still documents the UserResponse schema."""
+    return JSONResponse({"id": user.id, "email": user.email, "role": user.role}, status_code=status_code)
+
 
+# bcrypt burns ~100ms of CPU per call. Run it in a worker thread so the event loop
+# keeps serving other requests meanwhile (bcrypt releases the GIL while hashing).
+async def _hash(password: str) -> str:
+    hashed = await asyncio.to_thread(bcrypt.hashpw, password.encode(), bcrypt.gensalt())
+    return hashed.decode()
 
-def _check(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+async def _check(password: str, hashed: str) -> bool:
+    return await asyncio.to_thread(bcrypt.checkpw, password.encode(), hashed.encode())
 
 
 def _issue_token(user: UserModel) -> str:
@@ -79,22 +103,41 @@ def _issue_token(user: UserModel) -> str:
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGO)
 
 
+# Decoded-token cache — same scheme as _decode_token in the orders service, see there
+_TOKEN_CACHE_MAX = 10_000
+_token_cache: dict[str, tuple[float, dict]] = {}
+
+
+def _decode_token(token: str) -> dict:
+    hit = _token_cache.get(token)
+    if hit is not None:
+        if time.time() < hit[0]:
+            return hit[1]
+        _token_cache.pop(token, None)
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
+    if "exp" in payload:
+        if len(_token_cache) >= _TOKEN_CACHE_MAX:
+            _token_cache.pop(next(iter(_token_cache)), None)
+        _token_cache[token] = (payload["exp"], payload)
+    return payload
+
+
 @app.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(body: UserCreate, db: AsyncSession = Depends(get_db)):
-    existing = (await db.execute(select(UserModel).where(UserModel.email == body.email))).scalar_one_or_none()
+    existing = (await db.execute(_SEL_USER_BY_EMAIL, {"email": body.email})).scalar_one_or_none()
     if existing:
         raise HTTPException(status.HTTP_409_CONFLICT, "email already registered")
-    user = UserModel(email=body.email, hashed_password=_hash(body.password), role=body.role)
+    user = UserModel(email=body.email, hashed_password=await _hash(body.password), role=body.role)
     db.add(user)
     await db.commit()
     await db.refresh(user)
-    return user
+    return _user_response(user, status.HTTP_201_CREATED)
 
 
 @app.post("/token")
 async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
-    user = (await db.execute(select(UserModel).where(UserModel.email == form.username))).scalar_one_or_none()
-    if not user or not _check(form.password, user.hashed_password):
+    user = (await db.execute(_SEL_USER_BY_EMAIL, {"email": form.username})).scalar_one_or_none()
+    if not user or not await _check(form.password, user.hashed_password):
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "invalid credentials")
     return {"access_token": _issue_token(user), "token_type": "bearer"}
 
@@ -102,15 +145,15 @@ async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession =
 @app.get("/users/me", response_model=UserResponse)
 async def me(token: str, db: AsyncSession = Depends(get_db)):
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
+        payload = _decode_token(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "invalid token")
-    user = (await db.execute(select(UserModel).where(UserModel.email == payload["sub"]))).scalar_one_or_none()
+    user = (await db.execute(_SEL_USER_BY_EMAIL, {"email": payload["sub"]})).scalar_one_or_none()
     if not user:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "user not found")
-    return user
+    return _user_response(user)
 
 
 @app.get("/health")
@@ -1,17 +1,34 @@
 """Integration tests for the users service.
 
 FastAPI + httpx AsyncClient pattern — equivalent to Django's APIClient but async.
-TestClient (sync) wraps the ASGI app so no real server needed.
+ASGITransport calls the ASGI app in-process on the test's own event loop,
+so no real server and no per-request thread (unlike the sync TestClient).
 """
 
+import datetime
+import bcrypt
+import jwt
 import pytest
-import pytest_asyncio
-from httpx import AsyncClient
-from fastapi.testclient import TestClient
-from app.main import app, Base, engine
+from httpx import ASGITransport, AsyncClient
+from app import main
+from app.main import app, Base, engine, JWT_SECRET, JWT_ALGO
 
-# pytest-asyncio setup — needed for async test functions
+# anyio's pytest plugin runs the async tests and fixtures below
 pytest_plugins = ("anyio",)
+pytestmark     = pytest.mark.anyio
+
+_gensalt = bcrypt.gensalt
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def fast_bcrypt(monkeypatch):
+    """Cost 4 instead of 12 — ~2ms per hash instead of ~100ms, same code path."""
+    monkeypatch.setattr(bcrypt, "gensalt", lambda rounds=4, prefix=b"2b": _gensalt(4, prefix))
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -25,9 +42,8 @@ async def setup_db():
 
 
 @pytest.fixture
-def client():
-    """Sync test client — simpler for most tests."""
-    with TestClient(app) as c:
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         yield c
 
 
@@ -35,8 +51,8 @@ def client():
 #  Registration
 # ──────────────────────────────────────────
 
-def test_register_creates_user(client):
-    resp = client.post("/users", json={"email": "alice@test.com", "password": "secret123"})
+async def test_register_creates_user(client):
+    resp = await client.post("/users", json={"email": "alice@test.com", "password": "secret123"})
     assert resp.status_code == 201
     data = resp.json()
     assert data["email"] == "alice@test.com"
@@ -44,32 +60,37 @@ def test_register_creates_user(client):
     assert "id" in data
 
 
-def test_register_duplicate_email_returns_409(client):
+async def test_register_duplicate_email_returns_409(client):
     payload = {"email": "bob@test.com", "password": "pass"}
-    client.post("/users", json=payload)
-    resp = client.post("/users", json=payload)
+    await client.post("/users", json=payload)
+    resp = await client.post("/users", json=payload)
     assert resp.status_code == 409
 
 
+async def test_register_invalid_email_returns_422(client):
+    resp = await client.post("/users", json={"email": "not-an-email", "password": "pw"})
+    assert resp.status_code == 422
+
+
 # ──────────────────────────────────────────
 #  Login
 # ──────────────────────────────────────────
 
-def test_login_returns_token(client):
-    client.post("/users", json={"email": "carol@test.com", "password": "pw"})
-    resp = client.post("/token", data={"username": "carol@test.com", "password": "pw"})
+async def test_login_returns_token(client):
+    await client.post("/users", json={"email": "carol@test.com", "password": "pw"})
+    resp = await client.post("/token", data={"username": "carol@test.com", "password": "pw"})
     assert resp.status_code == 200
     assert "access_token" in resp.json()
 
 
-def test_login_wrong_password_returns_401(client):
-    client.post("/users", json={"email": "dave@test.com", "password": "correct"})
-    resp = client.post("/token", data={"username": "dave@test.com", "password": "wrong"})
+async def test_login_wrong_password_returns_401(client):
+    await client.post("/users", json={"email": "dave@test.com", "password": "correct"})
+    resp = await client.post("/token", data={"username": "dave@test.com", "password": "wrong"})
     assert resp.status_code == 401
 
 
-def test_login_unknown_user_returns_401(client):
-    resp = client.post("/token", data={"username": "ghost@test.com", "password": "x"})
+async def test_login_unknown_user_returns_401(client):
+    resp = await client.post("/token", data={"username": "ghost@test.com", "password": "x"})
     assert resp.status_code == 401
 
 
@@ -77,18 +98,58 @@ def test_login_unknown_user_returns_401(client):
 #  /users/me
 # ──────────────────────────────────────────
 
-def test_me_returns_user_for_valid_token(client):
-    client.post("/users", json={"email": "eve@test.com", "password": "pw"})
-    token_resp = client.post("/token", data={"username": "eve@test.com", "password": "pw"})
+async def test_me_returns_user_for_valid_token(client):
+    await client.post("/users", json={"email": "eve@test.com", "password": "pw"})
+    token_resp = await client.post("/token", data={"username": "eve@test.com", "password": "pw"})
     token = token_resp.json()["access_token"]
 
-    resp = client.get("/users/me", params={"token": token})
+    resp = await client.get("/users/me", params={"token": token})
     assert resp.status_code == 200
     assert resp.json()["email"] == "eve@test.com"
 
 
-def test_me_returns_401_for_invalid_token(client):
-    resp = client.get("/users/me", params={"token": "not-a-real-token"})
+async def test_me_repeated_calls_with_same_token(client, monkeypatch):
+    await client.post("/users", json={"email": "frank@test.com", "password": "pw"})
+    token = (await client.post("/token", data={"username": "frank@test.com", "password": "pw"})).json()["access_token"]
+
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+
+    # Second call is served from the decoded-token cache
+    for _ in range(2):
+        resp = await client.get("/users/me", params={"token": token})
+        assert resp.status_code == 200
+        assert resp.json()["email"] == "frank@test.com"
+    assert len(decodes) == 1
+    assert token in main._token_cache
+
+
+async def test_me_returns_401_for_token_expired_while_cached(client):
+    exp     = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)
+    payload = {"sub": "hank@test.com", "uid": 1, "role": "user", "exp": int(exp.timestamp())}
+    token   = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGO)
+    # Cached while it was still valid; it has expired since
+    main._token_cache[token] = (payload["exp"], payload)
+
+    resp = await client.get("/users/me", params={"token": token})
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "token expired"
+    assert token not in main._token_cache
+
+
+async def test_me_returns_401_for_expired_token(client):
+    token = jwt.encode(
+        {"sub": "gina@test.com", "uid": 1, "role": "user", "exp": datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)},
+        JWT_SECRET, algorithm=JWT_ALGO,
+    )
+    resp = await client.get("/users/me", params={"token": token})
+    assert resp.status_code == 401
+    assert resp.json()["detail"] == "token expired"
+
+
+async def test_me_returns_401_for_invalid_token(client):
+    resp = await client.get("/users/me", params={"token": "not-a-real-token"})
     assert resp.status_code == 401
 
 
@@ -96,7 +157,7 @@ def test_me_returns_401_for_invalid_token(client):
 #  Health
 # ──────────────────────────────────────────
 
-def test_health(client):
-    resp = client.get("/health")
+async def test_health(client):
+    resp = await client.get("/health")
     assert resp.status_code == 200
     assert resp.json()["status"] == "ok"
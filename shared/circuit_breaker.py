@@ -62,18 +62,22 @@ class CircuitBreaker:
         return self._state
 
     async def call(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
-        async with self._lock:
-            if self._state == CircuitState.OPEN:
-                elapsed = time.monotonic() - (self._opened_at or 0)
-                if elapsed < self.recovery_timeout:
-                    raise CircuitBreakerError(
-                        f"Circuit {self.name!r} is OPEN — rejecting request "
-                        f"(retry in {self.recovery_timeout - elapsed:.1f}s)"
-                    )
-                # Transition to HALF_OPEN for probe
-                self._state         = CircuitState.HALF_OPEN
-                self._success_count = 0
-                logger.info(f"[circuit] {self.name!r} → HALF_OPEN")
+        # Lock-free fast path: CLOSED/HALF_OPEN reads need no lock. Only the
+        # OPEN → HALF_OPEN transition mutates state, so only that takes the lock.
+        if self._state == CircuitState.OPEN:
+            elapsed = time.monotonic() - (self._opened_at or 0)
+            if elapsed < self.recovery_timeout:
+                raise self._rejection(elapsed)
+            async with self._lock:
+                # Re-check: another caller may have moved us on while we waited
+                if self._state == CircuitState.OPEN:
+                    elapsed = time.monotonic() - (self._opened_at or 0)
+                    if elapsed < self.recovery_timeout:
+                        raise self._rejection(elapsed)
+                    # Transition to HALF_OPEN for probe
+                    self._state         = CircuitState.HALF_OPEN
+                    self._success_count = 0
+                    logger.info(f"[circuit] {self.name!r} → HALF_OPEN")
 
         try:
             result = await func(*args, **kwargs)
@@ -84,6 +88,12 @@ class CircuitBreaker:
         await self._on_success()
         return result
 
+    def _rejection(self, elapsed: float) -> CircuitBreakerError:
+        return CircuitBreakerError(
+            f"Circuit {self.name!r} is OPEN — rejecting request "
+            f"(retry in {self.recovery_timeout - elapsed:.1f}s)"
+        )
+
     async def _on_failure(self, exc: Exception) -> None:
         async with self._lock:
             self._failure_count += 1
@@ -102,6 +112,11 @@ class CircuitBreaker:
                 )
 
     async def _on_success(self) -> None:
+        if self._state == CircuitState.CLOSED:
+            # Steady state: no transition possible, so skip the lock. A racing
+            # failure count reset is harmless.
+            self._failure_count = 0
+            return
         async with self._lock:
             self._failure_count = 0
             if self._state == CircuitState.HALF_OPEN:
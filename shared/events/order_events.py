@@ -1,60 +1,46 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Literal
-from datetime import datetime
+import time
 import uuid as _uuid
 
 # Event-driven messaging — Django signals are process-local.
 # For cross-service communication we need serialisable event schemas.
 # Pydantic makes them self-documenting and validates on deserialisation.
+# event_id / occurred_at use default_factory rather than an __init__ override,
+# so construction stays on pydantic-core's compiled path.
+# Timestamps are Unix epoch millis (UTC): cheaper to produce and to serialise.
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
 
 
 class OrderCreatedEvent(BaseModel):
     event_type: Literal["order.created"] = "order.created"
-    event_id:   str = None  # type: ignore[assignment]
-    occurred_at: datetime = None  # type: ignore[assignment]
+    event_id:   str      = Field(default_factory=lambda: str(_uuid.uuid4()))
+    occurred_at: int      = Field(default_factory=_now_ms)
 
     order_id:   str
     user_id:    int
     total_cents: int
     items:      list[dict]
 
-    def __init__(self, **data):
-        if "event_id" not in data:
-            data["event_id"] = str(_uuid.uuid4())
-        if "occurred_at" not in data:
-            data["occurred_at"] = datetime.utcnow()
-        super().__init__(**data)
-
 
 class OrderPaidEvent(BaseModel):
     event_type: Literal["order.paid"] = "order.paid"
-    event_id:   str = None  # type: ignore[assignment]
-    occurred_at: datetime = None  # type: ignore[assignment]
+    event_id:   str      = Field(default_factory=lambda: str(_uuid.uuid4()))
+    occurred_at: int      = Field(default_factory=_now_ms)
 
     order_id:   str
     user_id:    int
     amount_cents: int
 
-    def __init__(self, **data):
-        if "event_id" not in data:
-            data["event_id"] = str(_uuid.uuid4())
-        if "occurred_at" not in data:
-            data["occurred_at"] = datetime.utcnow()
-        super().__init__(**data)
-
 
 class OrderCancelledEvent(BaseModel):
     event_type: Literal["order.cancelled"] = "order.cancelled"
-    event_id:   str = None  # type: ignore[assignment]
-    occurred_at: datetime = None  # type: ignore[assignment]
+    event_id:   str      = Field(default_factory=lambda: str(_uuid.uuid4()))
+    occurred_at: int      = Field(default_factory=_now_ms)
 
     order_id: str
     user_id:  int
     reason:   str = ""
-
-    def __init__(self, **data):
-        if "event_id" not in data:
-            data["event_id"] = str(_uuid.uuid4())
-        if "occurred_at" not in data:
-            data["occurred_at"] = datetime.utcnow()
-        super().__init__(**data)
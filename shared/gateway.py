@@ -1,7 +1,14 @@
-from fastapi import FastAPI, Request, HTTPException
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+from fastapi import FastAPI
 from fastapi.responses import Response
+from starlette.requests import ClientDisconnect
+from starlette.types import ASGIApp, Receive, Scope, Send
 import httpx
+import json
 import os
+import sys
 import logging
 
 # API Gateway pattern — single entry point routes to the right microservice.
@@ -11,67 +18,281 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-SERVICES = {
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2]); without it,
+# stay on HTTP/1.1 rather than fail at startup.
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# Keys, URLs and route strings are interned: every copy that reaches a dict, the
+# trie or a log line is the same object, so comparisons short-circuit on identity.
+SERVICES = {sys.intern(k): sys.intern(v) for k, v in {
     "users":         os.environ.get("USERS_URL",         "http://localhost:8001"),
     "orders":        os.environ.get("ORDERS_URL",        "http://localhost:8002"),
     "notifications": os.environ.get("NOTIFICATIONS_URL", "http://localhost:8003"),
-}
+}.items()}
+
+
+async def _drain_access_log(queue: asyncio.Queue) -> None:
+    """Format and emit access-log records off the request path."""
+    while True:
+        method, path, service, status_code = await queue.get()
+        logger.info("[gateway] %s %s -> %s (%d)", method, path, service, status_code)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One client for the process: its connection pool keeps upstream connections alive
+    # across requests instead of paying TCP (+TLS) setup and teardown on every proxy call.
+    # With HTTP/2 (negotiated via ALPN on https:// backends) concurrent requests to one
+    # backend multiplex over a single connection; plain http:// stays on pooled HTTP/1.1.
+    app.state.http = httpx.AsyncClient(
+        http2=HTTP2,
+        timeout=httpx.Timeout(10.0, connect=2.0),
+        limits=httpx.Limits(max_connections=512, max_keepalive_connections=128, keepalive_expiry=30.0),
+    )
+    # Access log: proxy only enqueues a tuple; LogRecord creation, formatting and the
+    # handler lock happen in this task. Bounded — records are dropped when it's full.
+    app.state.log_q = asyncio.Queue(maxsize=10_000)
+    log_task        = asyncio.create_task(_drain_access_log(app.state.log_q))
+    try:
+        yield
+    finally:
+        log_task.cancel()
+        await app.state.http.aclose()
 
-app = FastAPI(title="API Gateway", version="0.1.0")
+
+app = FastAPI(title="API Gateway", version="0.1.0", lifespan=lifespan)
 
 # Route table: path prefix -> service name
-ROUTES: list[tuple[str, str]] = [
+ROUTES: tuple[tuple[str, str], ...] = tuple((sys.intern(p), sys.intern(svc)) for p, svc in (
     ("/users",         "users"),
     ("/token",         "users"),
     ("/orders",        "orders"),
     ("/notifications", "notifications"),
-]
+))
 
 
-def _resolve(path: str) -> str | None:
-    for prefix, service in ROUTES:
-        if path.startswith(prefix):
-            return service
-    return None
+# Route trie keyed on path segments, built once at import. Terminal nodes hold the
+# service name *and* its already-resolved base URL, so the hot path never touches SERVICES:
+#   {"users": {"__svc__": ("users", "http://localhost:8001")}, ...}
+# Resolving is one dict lookup per segment instead of a startswith() per route,
+# and prefixes match whole segments only ("/users" no longer matches "/usersx").
+_SVC = "__svc__"
 
 
-@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
-async def proxy(path: str, request: Request):
-    full_path = f"/{path}"
-    service   = _resolve(full_path)
-    if not service:
-        raise HTTPException(404, f"no route for {full_path!r}")
+def _build_trie(routes: tuple[tuple[str, str], ...]) -> dict:
+    trie: dict = {}
+    for prefix, service in routes:
+        node = trie
+        for seg in prefix.strip("/").split("/"):
+            node = node.setdefault(seg, {})
+        node[_SVC] = (service, SERVICES[service])
+    return trie
 
-    target_url = f"{SERVICES[service]}{full_path}"
-    headers    = dict(request.headers)
-    headers.pop("host", None)  # Don't forward the gateway's host header
 
-    body = await request.body()
+_ROUTE_TRIE = _build_trie(ROUTES)
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        try:
-            resp = await client.request(
-                method=request.method,
-                url=target_url,
-                headers=headers,
-                content=body,
-                params=dict(request.query_params),
-            )
-        except httpx.ConnectError:
-            raise HTTPException(503, f"service {service!r} unavailable")
-        except httpx.TimeoutException:
-            raise HTTPException(504, f"service {service!r} timed out")
-
-    logger.info("[gateway] %s %s -> %s (%d)", request.method, full_path, service, resp.status_code)
-
-    return Response(
-        content=resp.content,
-        status_code=resp.status_code,
-        headers=dict(resp.headers),
-        media_type=resp.headers.get("content-type"),
+
+# Response chunks: aiter_raw() gets no chunk_size. With one, httpx re-buffers until that
+# many bytes (or EOF) arrive, holding back small or slow streams such as SSE and
+# long-polls. httpcore already reads up to 64 KiB per recv, so a busy stream still
+# moves in large chunks and a quiet one is forwarded as soon as bytes arrive.
+# No pooled bytearray buffers: httpx has no read-into API, so each chunk arrives as a
+# fresh bytes object either way. Copying it into a pooled buffer would add a memcpy
+# per chunk, and recycling that buffer is unsafe while the server transport may still
+# hold a reference to it. Chunks are short-lived and freed by refcount, not the GC.
+
+# Hop-by-hop headers describe one connection, not the message — never forwarded
+HOP_BY_HOP = frozenset({
+    b"connection", b"keep-alive", b"transfer-encoding", b"upgrade",
+    b"proxy-authenticate", b"proxy-authorization", b"te", b"trailers",
+})
+# Request-side filter: hop-by-hop plus the gateway's own Host, so forwarding a header
+# is a single set lookup. ASGI servers already lowercase request header names.
+_HOP = HOP_BY_HOP | {b"host"}
+
+
+# Polling clients hit the same paths over and over; cache path -> target so repeats
+# skip the split + walk. Safe: the trie is fixed at import and the result depends on
+# the path alone.
+@functools.lru_cache(maxsize=4096)
+def _resolve(path: str) -> tuple[str, str] | None:
+    """Return (service, base_url) for the longest matching route prefix."""
+    node   = _ROUTE_TRIE
+    target = None
+    for seg in path.split("/")[1:]:
+        node = node.get(seg)
+        if node is None:
+            break
+        target = node.get(_SVC, target)
+    return target
+
+
+_JSON = (b"content-type", b"application/json")
+
+
+async def _send_error(send: Send, status_code: int, detail: str, *extra: tuple[bytes, bytes]) -> None:
+    """Same body FastAPI gives an HTTPException, sent as raw ASGI messages. A downed
+    backend turns every request into an error, so skip raise → catch → re-render there."""
+    body = json.dumps({"detail": detail}, separators=(",", ":")).encode()
+    await send({
+        "type": "http.response.start", "status": status_code,
+        "headers": [_JSON, (b"content-length", str(len(body)).encode()), *extra],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _request_body(receive: Receive):
+    """Yield the client's body as the server delivers it, straight off receive()."""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+        if body := message.get("body"):
+            yield body
+        if not message.get("more_body", False):
+            return
+
+
+async def proxy(scope: Scope, receive: Receive, send: Send, service: str, base: str) -> None:
+    """Plain ASGI: bytes in from receive(), bytes out through send() — no Request,
+    Response or dependency machinery between the client and httpx."""
+    full_path  = scope["path"]
+    # Upstream gets the path as the client sent it. scope["path"] is percent-decoded,
+    # so "/orders/a%2Fb" would go out as "/orders/a/b" and "%3F" as a real "?";
+    # the decoded form is only for routing and the access log.
+    raw_path   = scope.get("raw_path") or full_path.encode()
+    # Forward the query string verbatim (already percent-encoded, order and repeated
+    # keys preserved) instead of round-tripping it through a dict and re-encoding it.
+    qs         = scope["query_string"]
+    target_url = base + raw_path.decode("latin-1") + ("?" + qs.decode("latin-1") if qs else "")
+    # ASGI headers are already (bytes, bytes) pairs and httpx takes them as-is.
+    # Don't forward the gateway's host header, nor the client's Transfer-Encoding:
+    # httpx frames the streamed body itself. Content-Length is kept, in which case
+    # httpx sends the stream unchunked.
+    headers    = [(k, v) for k, v in scope["headers"] if k not in _HOP]
+
+    # Pipe the request body upstream as it arrives instead of buffering it whole.
+    # Bodyless requests (no Content-Length / Transfer-Encoding) send no content at
+    # all, otherwise httpx would announce an empty chunked body on every GET.
+    has_body = any(k == b"content-length" or k == b"transfer-encoding" for k, _ in scope["headers"])
+    body     = _request_body(receive) if has_body else None
+
+    state  = scope["app"].state
+    client = state.http
+    req    = client.build_request(
+        method=scope["method"],
+        url=target_url,
+        headers=headers,
+        content=body,
     )
+    try:
+        # stream=True: return as soon as upstream headers arrive, body still unread
+        resp = await client.send(req, stream=True)
+    except httpx.ConnectError:
+        return await _send_error(send, 503, f"service {service!r} unavailable")
+    except httpx.TimeoutException:
+        return await _send_error(send, 504, f"service {service!r} timed out")
+    except ClientDisconnect:
+        # Client went away mid-upload — nobody left to answer (nginx's 499)
+        await send({"type": "http.response.start", "status": 499, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    try:
+        # Skip the enqueue and its attribute lookups entirely when INFO is off
+        if logger.isEnabledFor(logging.INFO):
+            try:
+                state.log_q.put_nowait((scope["method"], full_path, service, resp.status_code))
+            except asyncio.QueueFull:
+                pass
+
+        # Upstream's raw header list goes out as-is, minus hop-by-hop framing.
+        # httpx keeps the wire casing, ASGI wants lowercase names.
+        await send({
+            "type": "http.response.start",
+            "status": resp.status_code,
+            "headers": [(name, v) for k, v in resp.headers.raw if (name := k.lower()) not in HOP_BY_HOP],
+        })
+        # Servers on ASGI spec < 2.4 (uvicorn) silently drop send() after the client is
+        # gone, so the pump alone would keep reading an endless SSE/long-poll upstream
+        # and hold its pooled connection. Watch receive() for the disconnect alongside
+        # it and stop the pump when it comes — what StreamingResponse does for us.
+        pump    = asyncio.create_task(_pump_body(resp, send))
+        watcher = asyncio.create_task(_wait_disconnect(receive))
+        try:
+            done, _ = await asyncio.wait((pump, watcher), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            pump.cancel()
+            watcher.cancel()
+        if pump in done:
+            pump.result()  # re-raise upstream read errors
+    finally:
+        await resp.aclose()
+
+
+async def _pump_body(resp: httpx.Response, send: Send) -> None:
+    # Forward the body chunk by chunk as it arrives instead of buffering it whole.
+    # aiter_raw() yields the bytes exactly as sent (still compressed), so upstream
+    # Content-Encoding/Content-Length stay valid.
+    async for chunk in resp.aiter_raw():
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _wait_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+# Liveness probes hit this constantly and the body never changes: serialise it once
+# and hand back the same Response — no per-call dict, JSON encoding or validation.
+_HEALTH = Response(
+    json.dumps({"status": "ok", "service": "gateway", "routes": len(ROUTES)}, separators=(",", ":")).encode(),
+    media_type="application/json",
+)
 
 
+# async def: a plain def would be dispatched to the threadpool on every probe
 @app.get("/health")
-def health():
-    return {"status": "ok", "service": "gateway", "routes": len(ROUTES)}
+async def health():
+    return _HEALTH
+
+
+PROXY_METHODS = frozenset({"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"})
+_ALLOW        = ", ".join(sorted(PROXY_METHODS)).encode()
+
+
+class ProxyMiddleware:
+    """Dispatch proxied paths before Starlette's router sees them.
+    The trie lookup on scope["path"] replaces the router's regex match of a
+    /{path:path} catch-all, and matched requests go to the raw ASGI proxy.
+    FastAPI only serves what has no route (/health, /docs, ...).
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        target = _resolve(scope["path"]) if scope["type"] == "http" else None
+        if target is None:
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] not in PROXY_METHODS:
+            await _send_error(send, 405, "Method Not Allowed", (b"allow", _ALLOW))
+            return
+        await proxy(scope, receive, send, *target)
+
+
+app.add_middleware(ProxyMiddleware)
+
+
+if __name__ == "__main__":
+    # The gateway is pure I/O, so the event loop and HTTP parser set its ceiling:
+    # uvloop (libuv) and httptools replace the pure-Python asyncio loop and h11.
+    # Equivalent CLI: uvicorn shared.gateway:app --loop uvloop --http httptools --workers N
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
@@ -0,0 +1,293 @@
+"""Tests for the API gateway.
+
+httpx.MockTransport stands in for the upstream services and ASGITransport calls
+the gateway in-process, so no servers and no sockets are involved.
+"""
+
+import asyncio
+import logging
+import httpx
+import pytest
+from httpx import ASGITransport, AsyncClient
+from shared.gateway import app, SERVICES
+
+# anyio's pytest plugin runs the async tests and fixtures below
+pytest_plugins = ("anyio",)
+pytestmark     = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+async def _chunks(*chunks: bytes, delay: float = 0):
+    """Response body as a live stream — like a real transport, unlike content=bytes,
+    which httpx treats as already read."""
+    for i, chunk in enumerate(chunks):
+        if i and delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+@pytest.fixture
+def upstream():
+    """Requests the gateway forwarded; set .respond to change the reply."""
+    class Upstream:
+        requests: list[httpx.Request] = []
+
+        @staticmethod
+        def respond(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, headers={"content-type": "application/json"}, content=_chunks(b'{"ok":true}'))
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        Upstream.requests.append(request)
+        return Upstream.respond(request)
+
+    # ASGITransport doesn't run the lifespan — wire up what it would create
+    app.state.http  = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    app.state.log_q = asyncio.Queue(maxsize=10_000)
+    return Upstream
+
+
+@pytest.fixture
+async def client(upstream):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def _call_asgi(method: str, path: str, headers: tuple = (), *, disconnect: asyncio.Event | None = None,
+                     on_send=None) -> list[dict]:
+    """Drive the gateway with raw ASGI messages, for what ASGITransport can't show:
+    it collects the whole response before returning and never disconnects.
+    receive() behaves like a server's: one empty body, then blocks until `disconnect`
+    is set (already set: the client is gone before its body arrives)."""
+    disconnect = disconnect or asyncio.Event()
+    body_sent  = False
+    sent: list[dict] = []
+
+    async def receive() -> dict:
+        nonlocal body_sent
+        if not body_sent and not disconnect.is_set():
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+        if on_send is not None:
+            on_send(message)
+
+    scope = {
+        "type": "http", "http_version": "1.1", "scheme": "http", "method": method,
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": list(headers), "server": ("test", 80), "client": ("127.0.0.1", 1234),
+    }
+    # Bounded: a proxy that never returns fails the test instead of hanging it
+    await asyncio.wait_for(app(scope, receive, send), 5)
+    return sent
+
+
+# ──────────────────────────────────────────
+#  Path forwarding
+# ──────────────────────────────────────────
+
+async def test_encoded_path_is_forwarded_unchanged(client, upstream):
+    resp = await client.get("/orders/ab%3Fx=1")
+    assert resp.status_code == 200
+    forwarded = upstream.requests[-1].url
+    assert forwarded.raw_path == b"/orders/ab%3Fx=1"
+    assert forwarded.query == b""
+
+
+async def test_encoded_slash_is_not_decoded(client, upstream):
+    await client.get("/orders/a%2Fb")
+    assert upstream.requests[-1].url.raw_path == b"/orders/a%2Fb"
+
+
+async def test_query_string_is_forwarded_verbatim(client, upstream):
+    await client.get("/users/me?a=1&a=2&b=x%20y")
+    assert upstream.requests[-1].url.query == b"a=1&a=2&b=x%20y"
+
+
+# ──────────────────────────────────────────
+#  Routing
+# ──────────────────────────────────────────
+
+@pytest.mark.parametrize("path, service", [
+    ("/users/me",      "users"),
+    ("/token",         "users"),
+    ("/orders",        "orders"),
+    ("/orders/abc",    "orders"),
+    ("/notifications", "notifications"),
+])
+async def test_routes_to_service(client, upstream, path, service):
+    resp = await client.get(path)
+    assert resp.status_code == 200
+    forwarded = upstream.requests[-1].url
+    assert str(forwarded.copy_with(path="/")) == SERVICES[service] + "/"
+    assert forwarded.path == path
+
+
+@pytest.mark.parametrize("path", ["/nope", "/usersx", "/"])
+async def test_unrouted_path_is_404(client, upstream, path):
+    resp = await client.get(path)
+    assert resp.status_code == 404
+    assert upstream.requests == []
+
+
+async def test_unsupported_method_is_405_with_allow(client, upstream):
+    resp = await client.request("TRACE", "/users/me")
+    assert resp.status_code == 405
+    assert resp.headers["allow"] == "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+    assert upstream.requests == []
+
+
+# ──────────────────────────────────────────
+#  Headers and body
+# ──────────────────────────────────────────
+
+async def test_hop_by_hop_request_headers_are_dropped(client, upstream):
+    await client.get("/users/me", headers={
+        "authorization": "Bearer t", "x-trace": "1",
+        "connection": "keep-alive", "keep-alive": "timeout=5", "te": "trailers",
+        "proxy-authorization": "Basic x",
+    })
+    forwarded = upstream.requests[-1].headers
+    assert forwarded["authorization"] == "Bearer t"
+    assert forwarded["x-trace"] == "1"
+    for name in ("keep-alive", "te", "proxy-authorization"):
+        assert name not in forwarded
+    # Host is the upstream's, not the gateway's
+    assert forwarded["host"] == httpx.URL(SERVICES["users"]).netloc.decode()
+
+
+async def test_hop_by_hop_response_headers_are_dropped(client, upstream):
+    upstream.respond = lambda request: httpx.Response(
+        200, headers=[("X-Upstream", "1"), ("Keep-Alive", "timeout=5"), ("Upgrade", "h2c")],
+        content=_chunks(b"ok"),
+    )
+    resp = await client.get("/users/me")
+    assert resp.headers["x-upstream"] == "1"
+    assert "keep-alive" not in resp.headers
+    assert "upgrade" not in resp.headers
+
+
+async def test_request_body_is_forwarded(client, upstream):
+    resp = await client.post("/orders", content=b"x" * 100_000)
+    assert resp.status_code == 200
+    assert upstream.requests[-1].content == b"x" * 100_000
+
+
+async def test_bodyless_request_sends_no_body(client, upstream):
+    await client.get("/users/me")
+    forwarded = upstream.requests[-1]
+    assert forwarded.content == b""
+    assert "transfer-encoding" not in forwarded.headers
+
+
+# ──────────────────────────────────────────
+#  Upstream failures
+# ──────────────────────────────────────────
+
+def _raise(exc: type[httpx.TransportError]):
+    def respond(request: httpx.Request) -> httpx.Response:
+        raise exc("boom", request=request)
+    return respond
+
+
+async def test_connect_error_is_503(client, upstream):
+    upstream.respond = _raise(httpx.ConnectError)
+    resp = await client.get("/orders/1")
+    assert resp.status_code == 503
+    assert resp.json() == {"detail": "service 'orders' unavailable"}
+
+
+async def test_timeout_is_504(client, upstream):
+    upstream.respond = _raise(httpx.ReadTimeout)
+    resp = await client.get("/orders/1")
+    assert resp.status_code == 504
+    assert resp.json() == {"detail": "service 'orders' timed out"}
+
+
+async def test_client_disconnect_mid_upload_is_499(upstream):
+    gone = asyncio.Event()
+    gone.set()
+    sent = await _call_asgi("POST", "/orders", [(b"content-length", b"10")], disconnect=gone)
+    assert sent[0]["status"] == 499
+
+
+# ──────────────────────────────────────────
+#  Streaming and access log
+# ──────────────────────────────────────────
+
+def _is_body(message: dict) -> bool:
+    return message["type"] == "http.response.body" and bool(message["body"])
+
+
+async def test_response_chunks_are_forwarded_as_they_arrive(upstream):
+    # Upstream holds the second event until the client has seen the first: a proxy
+    # that buffers never forwards event 1, and _call_asgi times out.
+    released = asyncio.Event()
+
+    async def events():
+        yield b"event: 1\n\n"
+        await released.wait()
+        yield b"event: 2\n\n"
+
+    upstream.respond = lambda request: httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, content=events(),
+    )
+    seen: list[tuple[bytes, bool]] = []
+
+    def on_send(message: dict) -> None:
+        if _is_body(message):
+            seen.append((message["body"], released.is_set()))
+            released.set()
+
+    await _call_asgi("GET", "/orders/events", on_send=on_send)
+    assert seen == [(b"event: 1\n\n", False), (b"event: 2\n\n", True)]
+
+
+async def test_client_disconnect_stops_reading_upstream(upstream):
+    pulled = 0
+
+    async def endless():
+        nonlocal pulled
+        while True:
+            pulled += 1
+            yield b"data: tick\n\n"
+            await asyncio.sleep(0)
+
+    upstream.respond = lambda request: httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, content=endless(),
+    )
+    gone = asyncio.Event()
+
+    def on_send(message: dict) -> None:
+        if _is_body(message):
+            gone.set()  # client leaves after the first event
+
+    await _call_asgi("GET", "/orders/events", disconnect=gone, on_send=on_send)
+    after = pulled
+    await asyncio.sleep(0.05)
+    assert pulled == after
+
+
+async def test_access_log_is_enqueued(client, upstream, caplog):
+    caplog.set_level(logging.INFO, logger="shared.gateway")
+    await client.get("/users/me?a=1")
+    assert app.state.log_q.get_nowait() == ("GET", "/users/me", "users", 200)
+
+
+# ──────────────────────────────────────────
+#  Health
+# ──────────────────────────────────────────
+
+async def test_health(client, upstream):
+    resp = await client.get("/health")
+    assert resp.status_code == 200
+    assert resp.json() == {"status": "ok", "service": "gateway", "routes": 4}
+    assert upstream.requests == []